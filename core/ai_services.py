@@ -1,94 +1,313 @@
 # core/ai_services.py
 import streamlit as st
 import os
+import re
+import json
+import threading
+from collections import OrderedDict
 import pandas as pd
-import google.generativeai as genai
-from gradio_client import Client
-from google.api_core import exceptions
-from .analytics import get_forecast  # Import analytics functions
+from .analytics import get_forecast, df_content_hash  # Import analytics functions
 
 # --- API & MODEL SETUP ---
-try:
-    GOOGLE_API_KEY = st.secrets.get("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
-        st.error("Missing Google API Key. Please set it in your secrets or environment variables.")
-        st.stop()
-    genai.configure(api_key=GOOGLE_API_KEY)
-    gemini_model = genai.GenerativeModel("gemini-1.5-flash")
-    # This is where Granite is used for one specific, lightweight task.
-    granite_client = Client("ad1xya/granite-api")
-except Exception as e:
-    st.error(f"Error during AI model initialization: {e}")
-    st.stop()
+@st.cache_resource(show_spinner=False)
+def get_gemini_model():
+    """Configures Gemini once per server process and returns the shared model client."""
+    import google.generativeai as genai  # heavy; imported on first use rather than at app start
+    api_key = st.secrets.get("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise RuntimeError("Missing Google API Key. Please set it in your secrets or environment variables.")
+    genai.configure(api_key=api_key)
+    # swap to "gemini-1.5-pro" for deeper reasoning (slower)
+    return genai.GenerativeModel("gemini-1.5-flash")
+
+
+@st.cache_resource(show_spinner=False)
+def get_granite_client():
+    """Shared Granite client. This is where Granite is used for one specific, lightweight task."""
+    from gradio_client import Client
+    return Client("ad1xya/granite-api")
+
+
+# --- TRANSACTION CATEGORIZATION ---
+# Keyword rules cover the common descriptions locally; first match wins. Only unambiguous
+# words and phrases belong here ("gas" could be a bill or a fuel stop, "auto" a rickshaw or
+# insurance, a refund may reverse an expense); anything else falls through to Granite.
+CATEGORY_RULES = [
+    (re.compile(r"\b(salary|payroll|stipend|bonus|interest credit|dividend)\b", re.I), "Income"),
+    (re.compile(r"\b(rent|emi|mortgage|home loan|car loan|lease)\b", re.I), "Rent/EMI"),
+    (re.compile(r"\b(sip|mutual fund|stocks?|shares|ppf|nps|fixed deposit|fd|elss|zerodha|groww)\b", re.I), "Investment"),
+    (re.compile(r"\b(electricity|water bill|gas bill|gas cylinder|lpg|broadband|internet|wifi|mobile recharge|recharge|postpaid|dth)\b", re.I), "Utilities"),
+    (re.compile(r"\b(uber|ola|rapido|metro|bus|train|irctc|taxi|cab|auto ?rickshaw|fuel|petrol|diesel|parking|toll)\b", re.I), "Transport"),
+    (re.compile(r"\b(grocery|groceries|supermarket|bigbasket|blinkit|zepto|dmart|vegetables?|fruits?|milk|kirana)\b", re.I), "Groceries"),
+]
 
 
-@st.cache_data(show_spinner=False)
 def get_transaction_category(description: str) -> str:
+    """Categorizes a transaction with the local keyword rules, using Granite only when no rule matches."""
+    for pattern, category in CATEGORY_RULES:
+        if pattern.search(description or ""):
+            return category
+    return _granite_category(description)
+
+
+@st.cache_data(show_spinner=False)
+def _granite_category(description: str) -> str:
     """Uses the specialized Granite model for simple transaction categorization."""
     prompt = f"Categorize the following transaction into one of these: Income, Rent/EMI, Groceries, Utilities, Transport, Investment, Other. Transaction: '{description}'"
     try:
         # This is the single, mandated use of the Granite model.
-        return granite_client.predict(prompt=prompt, api_name="/predict")
+        return get_granite_client().predict(prompt=prompt, api_name="/predict")
     except Exception:
         return "Other" # Fallback on error
 
 
-@st.cache_data(show_spinner=False)
-def get_ai_response(user_query: str, df: pd.DataFrame) -> str:
+# --- RESPONSE CACHE ---
+# Rephrasings that normalize to the same content words ("summarize my spending" /
+# "summarise spending") about the same ledger reuse the stored answer instead of paying
+# another Gemini round trip. Matching is exact on the normalized token set: questions
+# differing by a single number, category or word order are different questions.
+CACHE_MAX_ENTRIES = 256
+_STOPWORDS = {
+    "a", "an", "the", "my", "me", "i", "please", "can", "could", "you", "for", "of",
+    "to", "on", "in", "and", "is", "are", "do", "does", "what", "give", "show", "tell",
+}
+_word_re = re.compile(r"[a-z0-9]+")
+_ise_re = re.compile(r"is(e|ed|es|ing|ation)$")  # summarise -> summarize
+_yse_re = re.compile(r"yse$")                     # analyse -> analyze
+
+
+def _query_tokens(query: str) -> tuple:
     """
-    Intelligent router to classify user intent and generate a response using the appropriate tool or model.
+    Lowercased content words, in order, with British spellings and plurals folded together.
+    Order is kept so "from savings to investment" and "from investment to savings" differ.
     """
-    # Prepare context from the DataFrame
-    context_snippet = df.sort_values(by="date", ascending=False).head(20).to_string(index=False) if not df.empty else "No transactions yet."
-
-    # 1. Intent Classification using Gemini
-    classifier_prompt = f"""
-    You are an intelligent routing system for a financial assistant app. Classify the user's request into ONE of the following categories based on their query. Respond with only the category name.
-
-    Categories:
-    - 'BUDGETING': For questions about creating or analyzing a spending budget.
-    - 'FORECASTING': For questions about future spending projections or predictions.
-    - 'CATEGORIZATION': For direct requests to categorize a single transaction description (e.g., "categorize starbucks coffee").
-    - 'SAVINGS_INVESTMENT': For questions about saving money, investment plans, or financial goals.
-    - 'TAX_INFO': For questions related to income tax, deductions, or tax planning.
-    - 'CASH_MANAGEMENT': For questions about cash flow, income vs. expenses, or managing money.
-    - 'REPORT_SUMMARY': For requests to summarize spending, find top expenses, or general data analysis.
-    - 'GENERAL_QUERY': For all other financial questions, advice, or conversations.
-
-    User request: "{user_query}"
-    Category:
+    tokens = []
+    for tok in _word_re.findall((query or "").lower()):
+        if tok in _STOPWORDS:
+            continue
+        tok = _yse_re.sub("yze", _ise_re.sub(r"iz\1", tok))
+        if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+            tok = tok[:-1]
+        tokens.append(tok)
+    return tuple(tokens)
+
+
+@st.cache_resource(show_spinner=False)
+def _response_cache():
+    """Process-wide LRU of {(df_content_hash, tokens): response} plus its lock."""
+    return OrderedDict(), threading.Lock()
+
+
+def _cache_lookup(tokens: tuple, data_key: str) -> str | None:
+    if not tokens:
+        return None
+    cache, lock = _response_cache()
+    with lock:
+        key = (data_key, tokens)
+        if key in cache:
+            cache.move_to_end(key)
+            return cache[key]
+    return None
+
+
+def _cache_store(tokens: tuple, data_key: str, response: str) -> None:
+    if not tokens:
+        return
+    cache, lock = _response_cache()
+    with lock:
+        cache[(data_key, tokens)] = response
+        cache.move_to_end((data_key, tokens))
+        while len(cache) > CACHE_MAX_ENTRIES:
+            cache.popitem(last=False)
+
+
+def get_ai_response(user_query: str, df: pd.DataFrame, stream: bool = False):
     """
-    try:
-        response = gemini_model.generate_content(classifier_prompt, generation_config={"max_output_tokens": 20})
-        intent = response.text.strip().upper()
-
-        # 2. Tool Routing based on intent
-        if "CATEGORIZATION" in intent:
-            description = user_query.lower().replace("categorize", "").strip()
-            category = get_transaction_category(description)
-            return f"The transaction '{description}' is best categorized as: **{category}**"
-
-        elif "FORECASTING" in intent:
-            return get_forecast(df)
-
-        # For all other intents, use Gemini with a specialized prompt
-        else:
-            system_prompts = {
-                "BUDGETING": "You are a helpful financial advisor. Create a simple, actionable monthly budget based on the user's request and their transaction history. Present it clearly in markdown.",
-                "SAVINGS_INVESTMENT": "You are a financial planning assistant. Provide guidance on savings strategies or investment options based on the user's query and financial data. Include a disclaimer that this is not professional financial advice.",
-                "TAX_INFO": "You are a tax information assistant for India. Answer user questions about income tax concepts clearly and concisely. Include a disclaimer that you are not a certified tax professional and the user should consult one for official advice.",
-                "CASH_MANAGEMENT": "You are a financial analyst. Explain concepts of cash flow and analyze the provided transaction data to give insights on managing income and expenses.",
-                "REPORT_SUMMARY": "You are a data analyst. Summarize the provided transaction history, highlighting key insights like top spending categories, spending trends, and total income vs. expenses. Use markdown for clear formatting.",
-                "GENERAL_QUERY": "You are FinBuddy, a helpful and friendly financial assistant. Answer the user's question concisely and clearly based on their request and the provided context of their recent financial transactions."
-            }
-            system_prompt = system_prompts.get(intent, system_prompts["GENERAL_QUERY"])
-            
-            full_prompt = f"{system_prompt}\n\nUser Request: {user_query}\n\nTransaction History (for context):\n{context_snippet}"
-            
-            ai_response = gemini_model.generate_content(full_prompt)
-            return ai_response.text
+    Answers a chat query, reusing a cached answer for rephrasings of the same question about the same data.
+    With stream=True, returns an iterator of text chunks (for st.write_stream) instead of a string.
+    """
+    chunks = _response_chunks(user_query, df, stream)
+    return chunks if stream else "".join(chunks)
+
 
+@st.cache_data(persist="disk", max_entries=64, show_spinner=False, hash_funcs={pd.DataFrame: df_content_hash})
+def get_persisted_ai_response(user_query: str, df: pd.DataFrame) -> str:
+    """
+    Full answer for (query, ledger content hash), persisted to disk so it survives restarts.
+    For fixed prompts such as the budget plan. Errors raise, so they are never cached.
+    """
+    return "".join(_route_query(user_query, df))
+
+
+def _response_chunks(user_query: str, df: pd.DataFrame, stream: bool):
+    from google.api_core import exceptions
+
+    tokens = _query_tokens(user_query)
+    data_key = df_content_hash(df)
+    cached = _cache_lookup(tokens, data_key)
+    if cached is not None:
+        yield cached
+        return
+
+    parts = []
+    try:
+        for part in _route_query(user_query, df, stream=stream):
+            parts.append(part)
+            yield part
     except exceptions.GoogleAPICallError as e:
-        return f"Sorry, there was an issue with the AI service: API call failed. Details: {e}"
+        yield f"Sorry, there was an issue with the AI service: API call failed. Details: {e}"
+        return
     except Exception as e:
-        return f"An unexpected error occurred while processing your request: {e}"
\ No newline at end of file
+        yield f"An unexpected error occurred while processing your request: {e}"
+        return
+
+    _cache_store(tokens, data_key, "".join(parts))
+
+
+# --- INTENT ROUTING ---
+_categorize_re = re.compile(r"^\s*categori[sz]e\b", re.I)
+
+# Checked in order before any LLM call; the first match wins.
+INTENT_PATTERNS = [
+    (_categorize_re, "CATEGORIZATION"),
+    (re.compile(r"\b(forecast|predict|projection|next month)\b", re.I), "FORECASTING"),
+    (re.compile(r"\bbudget\b", re.I), "BUDGETING"),
+    (re.compile(r"\b(summari[sz]e|top (spending|expenses?))\b", re.I), "REPORT_SUMMARY"),
+    (re.compile(r"\b(tax|deductions?|80c)\b", re.I), "TAX_INFO"),
+    (re.compile(r"\b(save|saving|savings|invest|investing|investment)\b", re.I), "SAVINGS_INVESTMENT"),
+]
+
+INTENTS = {
+    "BUDGETING": "For questions about creating or analyzing a spending budget.",
+    "FORECASTING": "For questions about future spending projections or predictions.",
+    "CATEGORIZATION": 'For direct requests to categorize a single transaction description (e.g., "categorize starbucks coffee").',
+    "SAVINGS_INVESTMENT": "For questions about saving money, investment plans, or financial goals.",
+    "TAX_INFO": "For questions related to income tax, deductions, or tax planning.",
+    "CASH_MANAGEMENT": "For questions about cash flow, income vs. expenses, or managing money.",
+    "REPORT_SUMMARY": "For requests to summarize spending, find top expenses, or general data analysis.",
+    "GENERAL_QUERY": "For all other financial questions, advice, or conversations.",
+}
+
+SYSTEM_PROMPTS = {
+    "BUDGETING": "You are a helpful financial advisor. Create a simple, actionable monthly budget based on the user's request and their transaction history. Present it clearly in markdown.",
+    "SAVINGS_INVESTMENT": "You are a financial planning assistant. Provide guidance on savings strategies or investment options based on the user's query and financial data. Include a disclaimer that this is not professional financial advice.",
+    "TAX_INFO": "You are a tax information assistant for India. Answer user questions about income tax concepts clearly and concisely. Include a disclaimer that you are not a certified tax professional and the user should consult one for official advice.",
+    "CASH_MANAGEMENT": "You are a financial analyst. Explain concepts of cash flow and analyze the provided transaction data to give insights on managing income and expenses.",
+    "REPORT_SUMMARY": "You are a data analyst. Summarize the provided transaction history, highlighting key insights like top spending categories, spending trends, and total income vs. expenses. Use markdown for clear formatting.",
+    "GENERAL_QUERY": "You are FinBuddy, a helpful and friendly financial assistant. Answer the user's question concisely and clearly based on their request and the provided context of their recent financial transactions."
+}
+
+ROUTER_PROMPT = """
+You are the routing and answering system for a financial assistant app. In ONE step, classify the user's request into ONE of the categories below and, unless told otherwise, answer it in that category's persona.
+
+Categories:
+{categories}
+
+Rules:
+- For 'CATEGORIZATION', do not answer; set "target" to the transaction description to categorize.
+- For 'FORECASTING', do not answer; leave "response" empty.
+- Otherwise put the full markdown answer in "response".
+
+Return strictly valid JSON:
+{{"intent": "<CATEGORY>", "response": "<answer or empty>", "target": "<transaction description or empty>"}}
+
+User request: "{user_query}"
+
+Transaction History (for context):
+{context_snippet}
+"""
+
+
+def _router_categories() -> str:
+    lines = []
+    for intent, description in INTENTS.items():
+        persona = SYSTEM_PROMPTS.get(intent)
+        lines.append(f"- '{intent}': {description}" + (f" Persona: {persona}" if persona else ""))
+    return "\n".join(lines)
+
+
+def _parse_router_reply(text: str) -> dict:
+    """Parse the router's JSON reply; a non-JSON reply is treated as a plain general answer."""
+    try:
+        reply = json.loads(text)
+    except (TypeError, ValueError):
+        reply = None
+    if not isinstance(reply, dict):
+        return {"intent": "GENERAL_QUERY", "response": text or ""}
+    return reply
+
+
+def _match_intent(user_query: str) -> str | None:
+    """Cheap keyword routing for obvious intents; None means the query needs the Gemini router."""
+    for pattern, intent in INTENT_PATTERNS:
+        if pattern.search(user_query or ""):
+            return intent
+    return None
+
+
+def _context_snippet(df: pd.DataFrame) -> str:
+    """The 20 most recent transactions as compact CSV prompt context."""
+    if df is None or df.empty:
+        return "No transactions yet."
+    cols = df[["date", "category", "amount"]]
+    return _cached_context_snippet(df_content_hash(cols), cols)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _cached_context_snippet(content_hash: str, _df: pd.DataFrame) -> str:
+    # Keyed on a digest of the three columns sent to the model, so any edit to them
+    # (a re-categorized row included) refreshes the snippet; `_df` is not hashed.
+    recent = _df.assign(date=pd.to_datetime(_df["date"], errors="coerce")).nlargest(20, "date")
+    return recent.to_csv(index=False)
+
+
+def _route_query(user_query: str, df: pd.DataFrame, stream: bool = False):
+    """
+    Routes a query to a local tool or a Gemini persona and yields the answer text. Obvious intents
+    are matched by INTENT_PATTERNS without an LLM call; anything else is classified and answered in
+    a single Gemini call. Only CATEGORIZATION and FORECASTING are dispatched to local tools.
+    Only the persona call can stream; tool results and router answers arrive as one chunk.
+    """
+    context_snippet = _context_snippet(df)
+
+    intent = _match_intent(user_query)
+    reply = {}
+    if intent is None:
+        router_prompt = ROUTER_PROMPT.format(
+            categories=_router_categories(),
+            user_query=user_query,
+            context_snippet=context_snippet,
+        )
+        response = get_gemini_model().generate_content(router_prompt, generation_config={"response_mime_type": "application/json"})
+        reply = _parse_router_reply(response.text)
+        intent = str(reply.get("intent", "")).strip().upper()
+
+    # Tool Routing based on intent
+    if "CATEGORIZATION" in intent:
+        description = str(reply.get("target") or _categorize_re.sub("", user_query)).strip()
+        category = get_transaction_category(description)
+        yield f"The transaction '{description}' is best categorized as: **{category}**"
+        return
+
+    elif "FORECASTING" in intent:
+        yield get_forecast(df)
+        return
+
+    if reply:
+        # Answered inline by the router call
+        answer = str(reply.get("response") or "").strip()
+        if not answer:
+            raise ValueError("the AI service returned an empty answer.")
+        yield answer
+        return
+
+    system_prompt = SYSTEM_PROMPTS.get(intent, SYSTEM_PROMPTS["GENERAL_QUERY"])
+    full_prompt = f"{system_prompt}\n\nUser Request: {user_query}\n\nTransaction History (for context):\n{context_snippet}"
+    response = get_gemini_model().generate_content(full_prompt, stream=stream)
+    answered = False
+    for chunk in (response if stream else [response]):
+        text = chunk.text
+        answered = answered or bool(text.strip())
+        yield text
+    if not answered:
+        raise ValueError("the AI service returned an empty answer.")
@@ -1,13 +1,22 @@
 # core/analytics.py
+import hashlib
 import streamlit as st
 import pandas as pd
 import numpy as np
-from datetime import datetime
-import matplotlib.pyplot as plt
 
 
 
-@st.cache_data(show_spinner="Forecasting future expenses...")
+def df_content_hash(df: pd.DataFrame) -> str:
+    """
+    Digest of every value (and the index) in the frame. Any edit, including a
+    re-categorized or re-dated row, changes it, so cached results never go stale.
+    """
+    if df is None or df.empty:
+        return ""
+    return hashlib.md5(pd.util.hash_pandas_object(df, index=True).values.tobytes()).hexdigest()
+
+# Keyed on the ledger's content, so any edit (amount, category or date) recomputes.
+@st.cache_data(show_spinner="Forecasting future expenses...", persist="disk", max_entries=64, hash_funcs={pd.DataFrame: df_content_hash})
 def get_forecast(df: pd.DataFrame) -> str:
     """
     Generates a financial forecast summary using a simple linear trend model.
@@ -23,23 +32,25 @@ def get_forecast(df: pd.DataFrame) -> str:
 
     expense_df["date"] = pd.to_datetime(expense_df["date"])
     
-    # Aggregate expenses by day
-    daily_expenses = expense_df.groupby(expense_df["date"].dt.date)["amount"].sum().reset_index()
-    daily_expenses["ordinal"] = pd.to_datetime(daily_expenses["date"]).map(datetime.toordinal)
-
-    # Simple linear regression
-    coeffs = np.polyfit(daily_expenses["ordinal"], daily_expenses["amount"], 1)
-    poly = np.poly1d(coeffs)
+    # Aggregate expenses by day (once; reused for the trend fit and the average)
+    daily = expense_df.groupby(expense_df["date"].dt.normalize())["amount"].sum()
+    avg_daily_spend = daily.mean()
+    daily_expenses = daily.reset_index()
+    daily_expenses["ordinal"] = daily_expenses["date"].to_numpy().astype("datetime64[D]").astype(np.int64)
+
+    # Simple linear regression (closed-form least squares for a straight line)
+    x = daily_expenses["ordinal"].to_numpy(dtype=float)
+    y = daily_expenses["amount"].to_numpy(dtype=float)
+    xm, ym = x.mean(), y.mean()
+    sxx = ((x - xm) ** 2).sum()
+    slope = ((x - xm) * (y - ym)).sum() / sxx if sxx > 0 else 0.0
+    intercept = ym - slope * xm
     
     last_day_ord = daily_expenses["ordinal"].max()
     future_ord = np.arange(last_day_ord + 1, last_day_ord + 31)
     
-    # Predict future daily expenses and ensure they are not negative
-    future_preds = poly(future_ord)
-    future_preds[future_preds < 0] = 0
-    
-    total_forecast = float(np.sum(future_preds))
-    avg_daily_spend = expense_df.groupby(expense_df['date'].dt.date)['amount'].sum().mean()
+    # Predict future daily expenses, floor them at zero and total them in one expression
+    total_forecast = float(np.maximum(slope * future_ord + intercept, 0.0).sum())
     
     return (
         f"### 🗓️ 30-Day Expense Forecast\n\n"
@@ -48,74 +59,86 @@ def get_forecast(df: pd.DataFrame) -> str:
         f"> **Disclaimer:** This is a simple trend-based projection and may not account for large, irregular expenses."
     )
 
-def _prep_df(df: pd.DataFrame) -> pd.DataFrame:
+def prep_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Normalizes a raw project ledger for analysis: day-precision datetime64 dates,
+    numeric amounts, categorical categories and an `is_income` flag.
+    Rows whose date cannot be parsed are dropped.
+    """
     if df is None or df.empty:
-        return pd.DataFrame(columns=["date", "category", "amount", "note"])
+        return pd.DataFrame(columns=["date", "category", "amount", "note", "is_income"])
     out = df.copy()
-    out["date"] = pd.to_datetime(out["date"], errors="coerce")
+    out["date"] = pd.to_datetime(out["date"], errors="coerce", format="ISO8601").dt.normalize()
+    out = out.dropna(subset=["date"])
     out["amount"] = pd.to_numeric(out["amount"], errors="coerce").fillna(0.0)
-    out["category"] = out["category"].astype(str)
-    return out.dropna(subset=["date"])
-
-# ---------- Matplotlib charts ----------
+    # A ledger has a handful of distinct categories: store them once and compare codes, not strings.
+    # Amounts stay float64; float32 can't hold the 12-digit amounts the sidebar accepts.
+    cat = out["category"].astype(str).astype("category")
+    out["category"] = cat
+    income_codes = cat.cat.categories.str.strip().str.lower() == "income"
+    out["is_income"] = income_codes[cat.cat.codes.to_numpy()] if len(cat) else False
+    return out
+
+# ---------- Charts (Altair; rendered client-side) ----------
 def create_spending_pie_chart(df_cat_sum: pd.DataFrame):
     """
     Expects columns: category, amount (expenses only).
-    Returns a Matplotlib Figure.
+    Returns an Altair donut chart.
     """
     if df_cat_sum is None or df_cat_sum.empty:
         return None
 
-    labels = df_cat_sum["category"].astype(str).tolist()
-    values = df_cat_sum["amount"].astype(float).tolist()
+    import altair as alt  # ships with streamlit; imported on first chart
 
-    fig, ax = plt.subplots(figsize=(5.5, 5.5))
-    # donut pie
-    wedges, texts = ax.pie(values, startangle=90, wedgeprops=dict(width=0.45))
-    # center hole
-    centre_circle = plt.Circle((0, 0), 0.70, fc="white", alpha=0.0)  # transparent center (looks good on dark)
-    ax.add_artist(centre_circle)
-    ax.set(aspect="equal", title="Spending by Category")
-
-    # simple legend on right
-    ax.legend(wedges, labels, title="", loc="center left", bbox_to_anchor=(1.0, 0.5))
-    fig.tight_layout()
-    return fig
+    return (
+        alt.Chart(df_cat_sum[["category", "amount"]])
+        .mark_arc(innerRadius=50)
+        .encode(
+            theta=alt.Theta("amount:Q"),
+            color=alt.Color("category:N", sort=df_cat_sum["category"].astype(str).tolist(), title=""),
+            tooltip=["category:N", alt.Tooltip("amount:Q", format=",.2f")],
+        )
+        .properties(title="Spending by Category")
+    )
 
 def create_income_expense_bar_chart(df_long: pd.DataFrame):
     """
     Expects long df with columns: date, amount, type ∈ {'Income','Expense'}.
-    Returns a Matplotlib Figure.
+    Returns an Altair bar chart.
     """
     if df_long is None or df_long.empty:
         return None
 
-    df_long = df_long.sort_values("date")
-    dates = df_long["date"].dt.date.unique()
-
-    # split series
-    inc = df_long[df_long["type"] == "Income"].groupby("date")["amount"].sum().reindex(df_long["date"].sort_values().unique(), fill_value=0)
-    exp = df_long[df_long["type"] == "Expense"].groupby("date")["amount"].sum().reindex(df_long["date"].sort_values().unique(), fill_value=0)
+    import altair as alt
 
-    x = pd.to_datetime(inc.index).to_pydatetime()
-    fig, ax = plt.subplots(figsize=(7, 4.2))
-    width = 0.4
-
-    ax.bar([d for d in x], inc.values, width=width, label="Income")
-    ax.bar([d for d in x], -exp.values, width=width, label="Expense")  # show expenses downward for quick read
+    # one pass: daily Income/Expense sums side by side
+    pivot = (
+        df_long.pivot_table(index=df_long["date"].dt.normalize(), columns="type", values="amount", aggfunc="sum", fill_value=0)
+        .reindex(columns=["Income", "Expense"], fill_value=0)
+        .sort_index()
+    )
+    pivot["Expense"] = -pivot["Expense"]  # show expenses downward for quick read
+    daily = pivot.rename_axis(index="date", columns=None).reset_index().melt("date", var_name="type", value_name="amount")
 
-    ax.set_title("Income vs Expense")
-    ax.set_ylabel("Amount")
-    ax.axhline(0, linewidth=1)
-    ax.legend(loc="upper left")
-    fig.autofmt_xdate()
-    fig.tight_layout()
-    return fig
+    return (
+        alt.Chart(daily)
+        .mark_bar()
+        .encode(
+            x=alt.X("yearmonthdate(date):T", title=""),
+            y=alt.Y("amount:Q", title="Amount"),
+            color=alt.Color("type:N", sort=["Income", "Expense"], title=""),
+            tooltip=[alt.Tooltip("date:T"), "type:N", alt.Tooltip("amount:Q", format=",.2f")],
+        )
+        .properties(title="Income vs Expense")
+    )
 
 # ---------- Safe renderer for Streamlit ----------
 def st_matplotlib_safe(fig):
-    """Render a Matplotlib figure if present; otherwise show a friendly note."""
+    """Render an Altair chart or Matplotlib figure if present; otherwise show a friendly note."""
     if fig is None:
         st.info("No data to display.")
         return
-    st.pyplot(fig, use_container_width=True)
+    if hasattr(fig, "to_dict"):  # Altair chart
+        st.altair_chart(fig, use_container_width=True)
+    else:
+        st.pyplot(fig, use_container_width=True)
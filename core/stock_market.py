@@ -1,12 +1,25 @@
 # core/stock_market.py
 import json
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
 import pandas as pd
-from .ai_services import get_ai_response  # safe wrapper we added earlier
+from .ai_services import get_gemini_model
 
 @st.cache_data(ttl=300)  # Cache data for 5 minutes
 def get_stock_data(ticker_symbol: str):
     """Fetch 1Y price history + basic info for a ticker. Returns (info, history_df) or (None, error_str)."""
+    return _fetch_stock_data(ticker_symbol)
+
+@st.cache_data(ttl=300)  # Cache data for 5 minutes
+def get_stock_data_many(ticker_symbols: tuple) -> dict:
+    """Fetch several tickers concurrently. Returns {ticker: (info, history_df) or (None, error_str)}."""
+    symbols = list(dict.fromkeys(s.strip() for s in ticker_symbols if s and s.strip()))
+    if not symbols:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(10, len(symbols))) as ex:
+        return dict(zip(symbols, ex.map(_fetch_stock_data, symbols)))
+
+def _fetch_stock_data(ticker_symbol: str):
     try:
         import yfinance as yf  # lazy import so missing dep doesn't crash module import
     except Exception as e:
@@ -18,17 +31,24 @@ def get_stock_data(ticker_symbol: str):
             return None, "Empty ticker symbol."
 
         t = yf.Ticker(ticker_symbol)
-        info = t.info or {}
 
-        # Basic validity check
-        has_price = ("currentPrice" in info) or ("regularMarketPrice" in info)
-        if not has_price:
-            return None, (
-                f"Could not find data for '{ticker_symbol}'. "
-                "Check the symbol (e.g., 'MSFT' for US, 'RELIANCE.NS' for India)."
-            )
+        # info and history are independent HTTP calls; fetch them concurrently
+        with ThreadPoolExecutor(max_workers=2) as ex:
+            info_f = ex.submit(lambda: t.info or {})
+            hist_f = ex.submit(t.history, period="1y")
+
+            info = info_f.result()
+
+            # Basic validity check
+            has_price = ("currentPrice" in info) or ("regularMarketPrice" in info)
+            if not has_price:
+                return None, (
+                    f"Could not find data for '{ticker_symbol}'. "
+                    "Check the symbol (e.g., 'MSFT' for US, 'RELIANCE.NS' for India)."
+                )
+
+            hist = hist_f.result()
 
-        hist = t.history(period="1y")
         if isinstance(hist, pd.DataFrame) and not hist.empty:
             # Ensure a datetime index for plotting
             try:
@@ -43,9 +63,18 @@ def get_stock_data(ticker_symbol: str):
 # NOTE: We intentionally removed create_price_chart() because the Market tab
 # now builds a Matplotlib chart internally in ui/market.py (_price_fig).
 
+def _generate_stock_analysis(prompt: str) -> str:
+    """Gemini snapshot for a prompt. Errors raise so they are never cached by the caller."""
+    return get_gemini_model().generate_content(prompt).text
+
+@st.cache_data(ttl=900, max_entries=128, show_spinner=False)
+def _stock_analysis_for(key: tuple, _prompt: str) -> str:
+    """Snapshot per (symbol, currency, sector, industry); `_prompt` is not hashed."""
+    return _generate_stock_analysis(_prompt)
+
 def get_stock_analysis(info: dict) -> str:
     """
-    Uses Gemini (via core.ai_services.get_ai_response) to generate a neutral,
+    Uses Gemini (via core.ai_services.get_gemini_model) to generate a neutral,
     data-driven snapshot. Never uses advisory language.
     """
     # Keep payload concise
@@ -84,8 +113,10 @@ Rules:
 - No price predictions.
 """.strip()
 
+    # Volume and price tick on every refresh, which would make each prompt unique.
+    # Key on the fields that shape the write-up so repeat lookups within the TTL reuse it.
+    key = (info.get("symbol"), info.get("currency"), info.get("sector"), info.get("industry"))
     try:
-        return get_ai_response(prompt)
+        return _stock_analysis_for(key, prompt)
     except Exception as e:
-        # get_ai_response already handles most errors gracefully; this is a final guard.
         return f"An error occurred during AI analysis: {e}"
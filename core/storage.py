@@ -0,0 +1,68 @@
+# core/storage.py
+import os
+from urllib.parse import quote, unquote
+import pandas as pd
+
+# One Parquet file per project, in FINBUDDY_PROJECTS_DIR. The directory is shared by every
+# session of the process, so persistence stays off (projects live only in the session)
+# unless it is set explicitly, e.g. for a single-user local install.
+PROJECTS_DIR = os.getenv("FINBUDDY_PROJECTS_DIR") or None
+LEDGER_COLUMNS = ["date", "category", "amount", "note"]
+_SUFFIX = ".parquet"
+
+
+def _project_path(name: str) -> str:
+    # Project names are free text; percent-encode them so any name maps to a safe, reversible filename.
+    return os.path.join(PROJECTS_DIR, quote(name, safe="") + _SUFFIX)
+
+
+def sort_ledger(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ledgers are kept in ascending date order so views can show them newest-first with
+    a reversed slice. Returns `df` itself when it is already ordered (the usual append case).
+    """
+    if "date" not in df or df["date"].is_monotonic_increasing:
+        return df
+    return df.sort_values("date", kind="stable", ignore_index=True)
+
+
+def list_projects() -> list[str]:
+    """Names of all projects saved on disk, in alphabetical order."""
+    if not PROJECTS_DIR or not os.path.isdir(PROJECTS_DIR):
+        return []
+    return sorted(unquote(f[: -len(_SUFFIX)]) for f in os.listdir(PROJECTS_DIR) if f.endswith(_SUFFIX))
+
+
+def load_project(name: str) -> pd.DataFrame:
+    """Read a project's ledger; empty if it was never saved or persistence is off."""
+    if not PROJECTS_DIR or not os.path.exists(_project_path(name)):
+        return pd.DataFrame(columns=LEDGER_COLUMNS)
+    df = pd.read_parquet(_project_path(name))
+    if "date" in df and not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        # ledgers saved before dates were stored as datetimes hold ISO strings
+        df["date"] = pd.to_datetime(df["date"], errors="coerce", format="ISO8601")
+    return sort_ledger(df)
+
+
+def load_all_projects() -> dict[str, pd.DataFrame]:
+    """{name: ledger} for every saved project."""
+    return {name: load_project(name) for name in list_projects()}
+
+
+def save_project(name: str, df: pd.DataFrame) -> None:
+    """Write a project's ledger, replacing the previous file atomically. No-op when persistence is off."""
+    if not PROJECTS_DIR:
+        return
+    os.makedirs(PROJECTS_DIR, exist_ok=True)
+    path = _project_path(name)
+    tmp = path + ".tmp"
+    df.reset_index(drop=True).to_parquet(tmp, index=False, compression="zstd")
+    os.replace(tmp, path)
+
+
+def delete_project(name: str) -> None:
+    if not PROJECTS_DIR:
+        return
+    path = _project_path(name)
+    if os.path.exists(path):
+        os.remove(path)
@@ -10,18 +10,18 @@ except Exception:
 
 # main.py
 import streamlit as st
-import pandas as pd
 
 # Import UI modules
 
 from ui.forecast import compute_forecast, render_forecast_from
 from ui.theme import section_card  # optional: for glass card wrapper
-from ui.sidebar import render_sidebar
+from ui.sidebar import render_sidebar, get_prepped_project
 from ui.reports import render_reports_tab
 from ui.planning import render_planning_tab
 from ui.chat import render_chat_tab
 from ui.guides import render_guides_tab
 from ui.market import render_market_tab # <- ADD THIS IMPORT
+from core.storage import load_all_projects
 
 # --- 1. PAGE CONFIGURATION ---
 st.set_page_config(
@@ -35,11 +35,13 @@ st.set_page_config(
 def initialize_session_state():
     """Initializes session state variables if they don't exist."""
     if "projects" not in st.session_state:
-        st.session_state.projects = {} # Start with no projects
+        st.session_state.projects = load_all_projects() # Projects saved on disk, if any
     if "selected_project" not in st.session_state:
         st.session_state.selected_project = None # No project selected initially
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "prepped" not in st.session_state:
+        st.session_state.prepped = {} # Analysis-ready copies of projects, refreshed on mutation
 
 # --- 3. MAIN APP LAYOUT (MODIFIED) ---
 def main():
@@ -61,7 +63,7 @@ def main():
         """)
         st.stop()
     
-    df = st.session_state.projects.get(st.session_state.selected_project, pd.DataFrame())
+    df = get_prepped_project(st.session_state.selected_project)
 
     # --- TABS FOR NAVIGATION (MODIFIED) ---
     chat_tab, reports_tab, planning_tab, market_tab, guides_tab = st.tabs(
@@ -0,0 +1,37 @@
+# tests/test_category_rules.py
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("pandas")
+
+from core import ai_services
+
+
+@pytest.fixture
+def granite_calls(monkeypatch):
+    calls = []
+    monkeypatch.setattr(ai_services, "_granite_category", lambda d: calls.append(d) or "Granite")
+    return calls
+
+
+@pytest.mark.parametrize("description, category", [
+    ("Monthly salary", "Income"),
+    ("Gas bill for March", "Utilities"),
+    ("LPG cylinder refill", "Utilities"),
+    ("Auto rickshaw to office", "Transport"),
+    ("Petrol", "Transport"),
+])
+def test_unambiguous_rules_match(granite_calls, description, category):
+    assert ai_services.get_transaction_category(description) == category
+    assert granite_calls == []
+
+
+@pytest.mark.parametrize("description", [
+    "Gas station",
+    "auto insurance premium",
+    "Amazon refund",
+    "Card cashback",
+])
+def test_ambiguous_descriptions_go_to_granite(granite_calls, description):
+    assert ai_services.get_transaction_category(description) == "Granite"
+    assert granite_calls == [description]
@@ -0,0 +1,23 @@
+# tests/test_forecast_cache.py
+import pytest
+
+pytest.importorskip("streamlit")
+pd = pytest.importorskip("pandas")
+
+from core.analytics import get_forecast
+
+
+def _ledger(categories):
+    return pd.DataFrame({
+        "date": pd.to_datetime(["2024-01-01", "2024-01-05", "2024-01-10", "2024-01-20"]),
+        "category": categories,
+        "amount": [5000.0, 100.0, 3000.0, 200.0],
+        "note": [""] * 4,
+    })
+
+
+def test_recategorized_row_is_not_served_stale():
+    # Same length, total and latest date; only the Income label moves
+    before = get_forecast(_ledger(["Income", "Food", "Food", "Food"]))
+    after = get_forecast(_ledger(["Food", "Food", "Income", "Food"]))
+    assert before != after
@@ -0,0 +1,60 @@
+# tests/test_response_cache.py
+import pytest
+
+pytest.importorskip("streamlit")
+pytest.importorskip("pandas")
+
+from core import ai_services
+from core.ai_services import _cache_lookup, _cache_store, _query_tokens
+
+DATA = "ledger-a"
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    cache, lock = ai_services._response_cache()
+    with lock:
+        cache.clear()
+    yield
+
+
+def _store(question, answer, data_key=DATA):
+    _cache_store(_query_tokens(question), data_key, answer)
+
+
+def _lookup(question, data_key=DATA):
+    return _cache_lookup(_query_tokens(question), data_key)
+
+
+def test_rephrasing_hits():
+    _store("Summarize my spending", "summary")
+    assert _lookup("summarise spending") == "summary"
+    assert _lookup("Please summarize my spendings") == "summary"
+
+
+@pytest.mark.parametrize("cached, asked", [
+    (
+        "What would my tax be if my annual income is 800000 under the new regime",
+        "What would my tax be if my annual income is 1200000 under the new regime",
+    ),
+    ("move 200000 from savings to investment", "move 20000 from savings to investment"),
+    ("How much did I spend on 20,000 rent", "How much did I spend on 200,000 rent"),
+])
+def test_different_numbers_miss(cached, asked):
+    _store(cached, "answer for the cached figure")
+    assert _lookup(asked) is None
+
+
+def test_different_category_misses():
+    _store("How much did I spend on transport last month in total", "transport answer")
+    assert _lookup("How much did I spend on groceries last month in total") is None
+
+
+def test_word_order_matters():
+    _store("move 20000 from savings to investment", "to investment")
+    assert _lookup("move 20000 from investment to savings") is None
+
+
+def test_other_ledger_misses():
+    _store("Summarize my spending", "summary")
+    assert _lookup("Summarize my spending", data_key="ledger-b") is None
@@ -1,4 +1,5 @@
 # ui/chat.py
+from itertools import chain
 import streamlit as st
 from core.ai_services import get_ai_response
 
@@ -34,9 +35,12 @@ def render_chat_tab(df):
             st.markdown(prompt)
 
         with st.chat_message("assistant"):
+            # Stream tokens as they arrive; tool answers arrive as a single chunk.
+            # The spinner covers only the wait for the first chunk, not the whole answer.
+            chunks = get_ai_response(prompt, df, stream=True)
             with st.spinner("Thinking..."):
-                response = get_ai_response(prompt, df)
-                st.markdown(response)
+                first = next(chunks, "")
+            response = st.write_stream(chain([first], chunks))
         
         st.session_state.messages.append({"role": "assistant", "content": response})
         st.rerun()
\ No newline at end of file
@@ -1,72 +1,65 @@
 # ui/forecast.py
-import os, json
+import html
+import json
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 import streamlit as st
-from datetime import datetime, timedelta
+from core.ai_services import get_gemini_model
+from ui.sidebar import get_prepped_project
 
 # ---------- Gemini setup ----------
 def _get_gemini():
     try:
-        import google.generativeai as genai
-    except Exception:
-        return None, "Missing google-generativeai. Add to requirements.txt and redeploy."
-    key = st.secrets.get("GOOGLE_API_KEY") or os.getenv("GOOGLE_API_KEY")
-    if not key:
-        return None, "Missing GOOGLE_API_KEY. Add it in Streamlit Cloud → App → Settings → Secrets."
-    genai.configure(api_key=key)
-    # swap to "gemini-1.5-pro" for deeper reasoning (slower)
-    model = genai.GenerativeModel("gemini-1.5-flash")
-    return model, None
-
-# ---------- Data prep ----------
-def _to_date(x):
-    try:
-        return pd.to_datetime(x).date()
-    except Exception:
-        return None
-
-def _prep_df(df: pd.DataFrame) -> pd.DataFrame:
-    if df is None or df.empty:
-        return pd.DataFrame(columns=["date", "category", "amount", "note"])
-    out = df.copy()
-    out["date"] = out["date"].apply(_to_date)
-    out = out.dropna(subset=["date"])
-    out["category"] = out["category"].astype(str)
-    out["amount"] = pd.to_numeric(out["amount"], errors="coerce").fillna(0.0)
-    out["is_income"] = out["category"].str.strip().str.lower().eq("income")
-    return out
+        return get_gemini_model(), None
+    except Exception as e:
+        return None, str(e)
 
-def _window(df, start, end):
-    return df[(df["date"] >= start) & (df["date"] <= end)]
+def _aggregate(age_days, amounts, is_income, cat_ids, n_cats, days):
+    """
+    Array kernel for the window metrics. `age_days` counts days back from today;
+    the current window is ages [0, days) and the previous one [days, 2*days).
+    Returns per-window income/expense totals and per-category expense sums and row counts.
+    """
+    cur = (age_days >= 0) & (age_days < days)
+    prev = (age_days >= days) & (age_days < 2 * days)
+    cur_exp, prev_exp = cur & ~is_income, prev & ~is_income
+    return {
+        "cur_income": amounts[cur & is_income].sum(),
+        "cur_expense": amounts[cur_exp].sum(),
+        "prev_income": amounts[prev & is_income].sum(),
+        "prev_expense": amounts[prev_exp].sum(),
+        "cur_by_cat": np.bincount(cat_ids[cur_exp], weights=amounts[cur_exp], minlength=n_cats),
+        "cur_cat_rows": np.bincount(cat_ids[cur_exp], minlength=n_cats),
+        "prev_by_cat": np.bincount(cat_ids[prev_exp], weights=amounts[prev_exp], minlength=n_cats),
+    }
 
 def _last_n_days_metrics(df: pd.DataFrame, days=30):
-    today = datetime.today().date()
-    start = today - timedelta(days=days - 1)
-    prev_start = start - timedelta(days=days)
-    prev_end = start - timedelta(days=1)
+    today = pd.Timestamp.today().normalize()
 
-    cur = _window(df, start, today)
-    prev = _window(df, prev_start, prev_end)
+    cat_ids, categories = pd.factorize(df["category"])
+    agg = _aggregate(
+        (today - df["date"]).dt.days.to_numpy(),
+        df["amount"].to_numpy(dtype=float),
+        df["is_income"].to_numpy(dtype=bool),
+        cat_ids,
+        len(categories),
+        days,
+    )
 
-    cur_income = cur.loc[cur["is_income"], "amount"].sum()
-    cur_exp = cur.loc[~cur["is_income"], "amount"].sum()
+    cur_income = float(agg["cur_income"])
+    cur_exp = float(agg["cur_expense"])
     cur_net = cur_income - cur_exp
     cur_savings_rate = (cur_net / cur_income * 100.0) if cur_income > 0 else 0.0
 
-    prev_income = prev.loc[prev["is_income"], "amount"].sum()
-    prev_exp = prev.loc[~prev["is_income"], "amount"].sum()
+    prev_income = float(agg["prev_income"])
+    prev_exp = float(agg["prev_expense"])
     prev_net = prev_income - prev_exp
 
-    by_cat = (
-        cur.loc[~cur["is_income"]]
-        .groupby("category")["amount"]
-        .sum()
-        .sort_values(ascending=False)
-        .head(5)
-        .to_dict()
-    )
+    cur_by_cat = pd.Series(agg["cur_by_cat"], index=categories)
+    by_cat = cur_by_cat[agg["cur_cat_rows"] > 0].nlargest(5).to_dict()
+    prev_by_cat = dict(zip(categories, agg["prev_by_cat"]))
 
-    prev_by_cat = prev.loc[~prev["is_income"]].groupby("category")["amount"].sum().to_dict()
     spikes = []
     for cat, v in by_cat.items():
         pv = prev_by_cat.get(cat, 0.0)
@@ -77,7 +70,7 @@ def _last_n_days_metrics(df: pd.DataFrame, days=30):
 
     return {
         "period_days": days,
-        "today": str(today),
+        "today": str(today.date()),
         "current": {
             "income": float(cur_income),
             "expense": float(cur_exp),
@@ -173,45 +166,42 @@ def _parse_json_maybe(text: str):
     return None
 
 # ---------- Reusable compute + render ----------
+@st.cache_data(persist="disk", max_entries=64, show_spinner="Forecasting...")
+def _gemini_forecast(metrics: dict) -> dict:
+    """
+    Gemini forecast for a metrics snapshot, persisted to disk so restarts don't pay the call again.
+    The snapshot carries its own date, so the cache rolls over daily. Failures raise (and are not cached).
+    """
+    model, err = _get_gemini()
+    if err:
+        raise RuntimeError(err)
+    obj = _parse_json_maybe(_call_gemini(model, metrics)) or {}
+    if "status" not in obj:
+        raise ValueError("Gemini forecast is missing a status.")
+    return obj
+
+def _local_forecast(metrics: dict) -> dict:
+    status, emoji = _local_status(metrics)
+    return {
+        "status": status,
+        "emoji": emoji,
+        "headline": _fallback_headline(status, metrics),
+        "explanation": "",
+        "actions": ["Pre-commit a small saving", "Cap top category for 2 weeks"],
+        "score": 65 if status in ("CLEAR_SKIES", "PARTLY_CLOUDY") else 35,
+    }
+
 def compute_forecast(days: int = 30):
     """Compute and return (result_dict, metrics_dict). No UI. Call once, render many times."""
-    proj = st.session_state.get("selected_project")
-    projects = st.session_state.get("projects", {})
-    df = projects.get(proj) if proj in projects else None
-    df = _prep_df(df)
+    df = get_prepped_project(st.session_state.get("selected_project"))
     if df.empty:
         return {"empty": True}, {"period_days": days}
     metrics = _last_n_days_metrics(df, days=days)
-    model, err = _get_gemini()
-
-    if err:
-        status, emoji = _local_status(metrics)
-        obj = {
-            "status": status,
-            "emoji": emoji,
-            "headline": _fallback_headline(status, metrics),
-            "explanation": "",
-            "actions": ["Pre-commit a small saving", "Cap top category for 2 weeks"],
-            "score": 65 if status in ("CLEAR_SKIES", "PARTLY_CLOUDY") else 35,
-        }
-        return obj, metrics
 
     try:
-        raw = _call_gemini(model, metrics)
-        obj = _parse_json_maybe(raw) or {}
+        obj = _gemini_forecast(metrics)
     except Exception:
-        obj = {}
-
-    if not obj or "status" not in obj:
-        status, emoji = _local_status(metrics)
-        obj = {
-            "status": status,
-            "emoji": emoji,
-            "headline": _fallback_headline(status, metrics),
-            "explanation": "",
-            "actions": ["Pre-commit a small saving", "Cap top category for 2 weeks"],
-            "score": 65 if status in ("CLEAR_SKIES", "PARTLY_CLOUDY") else 35,
-        }
+        obj = _local_forecast(metrics)
     return obj, metrics
 
 def render_forecast_from(obj: dict, metrics: dict, title="Financial Forecast"):
@@ -256,21 +246,27 @@ def render_forecast():
     render_forecast_from(obj, metrics)
 
 # ---------- UI bits ----------
-def _status_badge(emoji: str, headline: str):
-    st.markdown(
-        f"""
-        <div style="display:flex;align-items:center;gap:.75rem;
-                    padding:.9rem 1rem;border-radius:16px;
-                    border:1px solid rgba(255,255,255,.12);
-                    background:linear-gradient(135deg, rgba(124,58,237,.18), rgba(6,182,212,.12));
-                    box-shadow:0 10px 30px rgba(124,58,237,.25);">
-            <div style="font-size:1.6rem">{emoji}</div>
-            <div style="font-weight:700">{headline}</div>
-        </div>
-        """,
-        unsafe_allow_html=True,
+_BADGE_CSS = (
+    "<style>"
+    ".forecast-badge{display:flex;align-items:center;gap:.75rem;padding:.9rem 1rem;border-radius:16px;"
+    "border:1px solid rgba(255,255,255,.12);"
+    "background:linear-gradient(135deg, rgba(124,58,237,.18), rgba(6,182,212,.12));"
+    "box-shadow:0 10px 30px rgba(124,58,237,.25);}"
+    ".forecast-badge .fb-emoji{font-size:1.6rem}"
+    ".forecast-badge .fb-headline{font-weight:700}"
+    "</style>"
+)
+
+@lru_cache(maxsize=64)
+def _badge_html(emoji: str, headline: str) -> str:
+    return (
+        f'<div class="forecast-badge"><div class="fb-emoji">{html.escape(emoji)}</div>'
+        f'<div class="fb-headline">{html.escape(headline)}</div></div>'
     )
 
+def _status_badge(emoji: str, headline: str):
+    st.markdown(_BADGE_CSS + _badge_html(emoji, headline), unsafe_allow_html=True)
+
 def _fallback_headline(status, m):
     net = m.get("current", {}).get("net", 0)
     sr = m.get("current", {}).get("savings_rate_pct", 0)
@@ -1,11 +1,33 @@
 # ui/market.py
+import hashlib
+import io
 import streamlit as st
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from core.stock_market import get_stock_data, get_stock_analysis
 
-def _price_fig(history: pd.DataFrame, ticker: str):
-    """Create a Matplotlib price chart (with 20D/50D MAs if available)."""
+MAX_PLOT_POINTS = 2000  # more points than this can't be told apart at chart width
+
+def _minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Sorted indices of each bucket's min and max (plus both endpoints), about n_out in total.
+    Keeps peaks and dips visible while drawing a fraction of the segments.
+    """
+    edges = np.linspace(0, len(y), max(n_out // 2, 1) + 1).astype(int)
+    idx = [0, len(y) - 1]
+    for a, b in zip(edges[:-1], edges[1:]):
+        if b > a:
+            seg = y[a:b]
+            idx += [a + int(seg.argmin()), a + int(seg.argmax())]
+    return np.unique(idx)
+
+def _sma(a: np.ndarray, w: int) -> np.ndarray:
+    """Simple moving average via a cumulative-sum difference; NaN for the first w-1 points like rolling(w)."""
+    c = np.cumsum(np.insert(a, 0, 0.0))
+    return np.concatenate([np.full(w - 1, np.nan), (c[w:] - c[:-w]) / w])
+
+def _price_fig(history: pd.DataFrame, ticker: str) -> bytes | None:
+    """Render the Matplotlib price chart (with 20D/50D MAs if available) as PNG bytes."""
     if history is None or history.empty:
         return None
 
@@ -24,21 +46,50 @@ def _price_fig(history: pd.DataFrame, ticker: str):
         price_col = num_cols[0]
 
     s = pd.to_numeric(df[price_col], errors="coerce").dropna()
+    if s.empty:
+        return None
 
-    # Ensure datetime index for nicer x-axis formatting
+    # Ensure a tz-naive datetime index: yfinance returns exchange-local tz-aware stamps,
+    # and Matplotlib converts tz-aware values per point/tick, which is far slower
     try:
         s.index = pd.to_datetime(s.index)
+        if getattr(s.index, "tz", None) is not None:
+            s.index = s.index.tz_localize(None)  # keep exchange-local wall time
     except Exception:
         pass
 
-    fig, ax = plt.subplots(figsize=(8, 4))
-    ax.plot(s.index, s.values, linewidth=1.5, label="Price")
+    digest = hashlib.md5(pd.util.hash_pandas_object(s, index=True).values.tobytes()).hexdigest()
+    return _render_price_png(ticker, digest, s)
+
+@st.cache_data(ttl=300, max_entries=32, show_spinner=False)
+def _render_price_png(ticker: str, digest: str, _s: pd.Series) -> bytes:
+    """
+    Draw the price chart once per (ticker, digest of dates and prices) and cache the PNG.
+    Any updated bar changes the digest; ttl matches get_stock_data. Each call draws on its
+    own bare Figure (not pyplot), so nothing mutable is shared between sessions.
+    """
+    x = _s.index
+    y = _s.to_numpy(dtype=float)
+    # Moving averages come from the full series; downsampling only thins what gets drawn
+    ma20 = _sma(y, 20) if len(y) >= 20 else None
+    ma50 = _sma(y, 50) if len(y) >= 50 else None
+    if len(y) > MAX_PLOT_POINTS:
+        keep = _minmax_indices(y, MAX_PLOT_POINTS)
+        x, y = x[keep], y[keep]
+        ma20 = ma20[keep] if ma20 is not None else None
+        ma50 = ma50[keep] if ma50 is not None else None
+
+    from matplotlib.figure import Figure  # only paid once a ticker is actually charted
+
+    fig = Figure(figsize=(8, 4))
+    ax = fig.subplots()
+    ax.plot(x, y, linewidth=1.5, label="Price")
 
     # Add simple moving averages if enough data
-    if len(s) >= 20:
-        ax.plot(s.index, s.rolling(20).mean(), linewidth=1, linestyle="--", label="20D MA")
-    if len(s) >= 50:
-        ax.plot(s.index, s.rolling(50).mean(), linewidth=1, linestyle=":", label="50D MA")
+    if ma20 is not None:
+        ax.plot(x, ma20, linewidth=1, linestyle="--", label="20D MA")
+    if ma50 is not None:
+        ax.plot(x, ma50, linewidth=1, linestyle=":", label="50D MA")
 
     ax.set_title(f"{ticker} — Price")
     ax.set_ylabel("Price")
@@ -46,7 +97,9 @@ def _price_fig(history: pd.DataFrame, ticker: str):
     ax.legend(loc="upper left")
     fig.autofmt_xdate()
     fig.tight_layout()
-    return fig
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=200, bbox_inches="tight")  # st.pyplot's defaults
+    return buf.getvalue()
 
 def render_market_tab():
     """Renders the UI for the stock market information tab (Matplotlib version)."""
@@ -88,9 +141,9 @@ def render_market_tab():
         st.markdown("---")
 
         # --- Chart (Matplotlib) and Analysis ---
-        fig = _price_fig(history, ticker)
-        if fig is not None:
-            st.pyplot(fig, use_container_width=True)
+        png = _price_fig(history, ticker)
+        if png is not None:
+            st.image(png, use_container_width=True)
         else:
             st.info("No price data to chart.")
 
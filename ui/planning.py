@@ -2,7 +2,9 @@
 import streamlit as st
 import pandas as pd
 from core.analytics import get_forecast
-from core.ai_services import get_ai_response
+from core.ai_services import get_persisted_ai_response
+
+BUDGET_PROMPT = "Based on my transaction history, create a simple monthly budget plan for me. Suggest categories and amounts."
 
 def render_planning_tab(df: pd.DataFrame):
     """Renders the planning tab for forecasts and budgets."""
@@ -13,7 +15,7 @@ def render_planning_tab(df: pd.DataFrame):
     with col1:
         st.subheader("Expense Forecaster")
         with st.container(border=True):
-            forecast_result = get_forecast(df)
+            forecast_result = get_forecast(df)  # st.cache_data keyed on the ledger's content hash
             st.markdown(forecast_result)
 
     with col2:
@@ -21,10 +23,12 @@ def render_planning_tab(df: pd.DataFrame):
         with st.container(border=True):
             st.markdown("Generate a personalized budget based on your spending.")
             if st.button("Generate My Budget Plan"):
-                if 'budget_plan' not in st.session_state or st.session_state.budget_plan is None:
-                    with st.spinner("Creating your budget..."):
-                        prompt = "Based on my transaction history, create a simple monthly budget plan for me. Suggest categories and amounts."
-                        st.session_state.budget_plan = get_ai_response(prompt, df)
-                
+                # Cached per ledger content (on disk), so regenerating for unchanged data is free
+                with st.spinner("Creating your budget..."):
+                    try:
+                        st.session_state.budget_plan = get_persisted_ai_response(BUDGET_PROMPT, df)
+                    except Exception as e:
+                        st.session_state.budget_plan = f"An unexpected error occurred while processing your request: {e}"
+
             if 'budget_plan' in st.session_state and st.session_state.budget_plan:
                 st.markdown(st.session_state.budget_plan)
\ No newline at end of file
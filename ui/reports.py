@@ -5,30 +5,44 @@ from core.analytics import create_spending_pie_chart, create_income_expense_bar_
 
 # ui/reports.py
 import streamlit as st
+import numpy as np
 import pandas as pd
 from core.analytics import (
-    create_spending_pie_chart,        # now returns a Matplotlib Figure
-    create_income_expense_bar_chart,  # now returns a Matplotlib Figure
+    create_spending_pie_chart,        # returns an Altair chart
+    create_income_expense_bar_chart,  # returns an Altair chart
+    df_content_hash,
 )
 
+@st.cache_data(show_spinner=False, max_entries=32, hash_funcs={pd.DataFrame: df_content_hash})
+def _report_aggregates(df: pd.DataFrame):
+    """
+    (total_income, total_expense, cat_sum, long_df) for the prepped ledger. Keyed on its
+    content hash, so a re-categorized or re-dated row recomputes and only identical
+    ledgers share an entry.
+    """
+    # prep_df already normalized the category once into `is_income`; reuse it everywhere below
+    is_income = df["is_income"].to_numpy(dtype=bool)
+    amt = df["amount"].to_numpy(dtype=float)
+    total_income = float(amt[is_income].sum())
+    total_expense = float(amt[~is_income].sum())
+    cat_sum = (
+        df[~is_income].groupby("category", as_index=False, observed=True)["amount"]
+        .sum()
+        .sort_values("amount", ascending=False)
+    )
+    long_df = df[["date", "amount"]].assign(type=np.where(is_income, "Income", "Expense"))
+    return total_income, total_expense, cat_sum, long_df
+
 def render_reports_tab(df: pd.DataFrame):
-    """Renders the dashboard with visual reports (Matplotlib)."""
+    """Renders the dashboard with visual reports (Altair). Expects the prepped (prep_df) ledger."""
     st.subheader("Financial Dashboard")
 
     if df is None or df.empty:
         st.warning("No transaction data available. Please add transactions in the sidebar to view reports.")
         return
 
-    # --- Normalize data once ---
-    df = df.copy()
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
-    df["category"] = df["category"].astype(str)
-    df = df.dropna(subset=["date"])
-
     # --- Key Metrics ---
-    total_income = df[df["category"].str.strip().str.lower() == "income"]["amount"].sum()
-    total_expense = df[df["category"].str.strip().str.lower() != "income"]["amount"].sum()
+    total_income, total_expense, cat_sum, long_df = _report_aggregates(df)
     net_savings = total_income - total_expense
 
     c1, c2, c3 = st.columns(3)
@@ -38,36 +52,34 @@ def render_reports_tab(df: pd.DataFrame):
 
     st.markdown("---")
 
-    # --- Visualizations (Matplotlib) ---
+    # --- Visualizations (Altair) ---
     col1, col2 = st.columns(2)
 
     # Spending by Category (donut pie)
     with col1:
         st.subheader("Spending by Category")
-        exp_only = df[df["category"].str.strip().str.lower() != "income"]
-        cat_sum = (
-            exp_only.groupby("category", as_index=False)["amount"]
-            .sum()
-            .sort_values("amount", ascending=False)
-        )
-        fig1 = create_spending_pie_chart(cat_sum)  # Matplotlib Figure
+        fig1 = create_spending_pie_chart(cat_sum)
         if fig1 is not None:
-            st.pyplot(fig1, use_container_width=True)
+            st.altair_chart(fig1, use_container_width=True)
         else:
             st.info("No expense data to display.")
 
     # Income vs. Expenses (bar; expenses shown downward)
     with col2:
         st.subheader("Income vs. Expenses")
-        long_df = df.copy()
-        long_df["type"] = long_df["category"].str.strip().str.lower().eq("income").map({True: "Income", False: "Expense"})
-        long_df = long_df[["date", "amount", "type"]]
-        fig2 = create_income_expense_bar_chart(long_df)  # Matplotlib Figure
+        fig2 = create_income_expense_bar_chart(long_df)
         if fig2 is not None:
-            st.pyplot(fig2, use_container_width=True)
+            st.altair_chart(fig2, use_container_width=True)
         else:
             st.info("No income/expense data to display.")
 
     # Raw table (latest first)
     st.markdown("### Transactions (latest first)")
-    st.dataframe(df.sort_values("date", ascending=False), use_container_width=True, hide_index=True)
+    # Same columns as the raw ledger: the prepped frame's is_income flag is internal
+    table = df.drop(columns="is_income").iloc[::-1]  # ledger is kept in date order
+    st.dataframe(
+        table.assign(category=table["category"].astype(str)),
+        use_container_width=True,
+        hide_index=True,
+        column_config={"date": st.column_config.DateColumn("date", format="YYYY-MM-DD")},
+    )
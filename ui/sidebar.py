@@ -4,9 +4,13 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date
 from decimal import Decimal, InvalidOperation
+from functools import lru_cache
+from core.analytics import prep_df
+from core import storage
 
 # =================== CONSTANTS ===================
 MAX_AMOUNT_DEC = Decimal("999999999999.9999999999")   # manual max (12 digits + 10 decimals)
+AMOUNT_QUANTUM = Decimal("0.0000000001")              # 10 decimals
 SLIDER_MIN = 0.0
 SLIDER_MAX = 100_000.0
 SLIDER_STEP = 10_000.0
@@ -19,15 +23,48 @@ DEFAULT_CATEGORIES = [
 # =================== STATE HELPERS ===================
 def _ensure_state():
     if "projects" not in st.session_state:
-        st.session_state.projects = {
-            "Default": pd.DataFrame(columns=["date", "category", "amount", "note"])
-        }
+        st.session_state.projects = storage.load_all_projects() or {"Default": _empty_ledger()}
     if "selected_project" not in st.session_state:
         st.session_state.selected_project = next(iter(st.session_state.projects.keys()))
     if "last_project" not in st.session_state:
         st.session_state.last_project = st.session_state.selected_project
+    if "prepped" not in st.session_state:
+        st.session_state.prepped = {}
+
+def _save_project(name: str, df: pd.DataFrame):
+    """Store a project's ledger, refresh its analysis-ready copy and write it to disk."""
+    ordered = storage.sort_ledger(df)
+    if ordered is not df:
+        # Re-sorting renumbers the rows, so the edit picker's index (and the fields filled
+        # from it) would point at a different transaction; start the selection over
+        _clear_edit_fields()
+        if "edit_row_idx" in st.session_state:
+            del st.session_state["edit_row_idx"]
+    df = ordered
+    st.session_state.projects[name] = df
+    st.session_state.prepped[name] = prep_df(df)
+    try:
+        storage.save_project(name, df)
+    except Exception as e:
+        st.warning(f"Saved for this session only; writing '{name}' to disk failed: {e}")
+
+def get_prepped_project(name: str) -> pd.DataFrame:
+    """
+    Analysis-ready (prep_df) frame for a project. Derived once per mutation and shared
+    by every tab, instead of each tab re-copying and re-parsing the raw ledger.
+    Callers must treat it as read-only.
+    """
+    if "prepped" not in st.session_state:
+        st.session_state.prepped = {}
+    if name not in st.session_state.prepped:
+        st.session_state.prepped[name] = prep_df(st.session_state.get("projects", {}).get(name))
+    return st.session_state.prepped[name]
 
 def _parse_date(val) -> date:
+    if val is None or pd.isna(val):
+        return datetime.today().date()
+    if isinstance(val, datetime):  # includes pd.Timestamp, the stored type
+        return val.date()
     if isinstance(val, date):
         return val
     s = str(val)
@@ -40,7 +77,9 @@ def _parse_date(val) -> date:
             return datetime.today().date()
 
 # =================== AMOUNT PARSING ===================
-_amount_sanitize_re = re.compile(r"[^\d\.]")  # keep digits and dot
+# One pass: drop "Rs." as a unit (its dot isn't a decimal point), then anything but digits and dots.
+# Currency words (INR, Rs, रु), ₹, commas and spaces all fall under the second branch.
+_amount_sanitize_re = re.compile(r"Rs\.|[^\d.]")
 
 def _normalize_amount_text(text: str) -> str:
     """
@@ -48,22 +87,17 @@ def _normalize_amount_text(text: str) -> str:
     """
     if not text:
         return ""
-    t = str(text).strip()
-    t = (t.replace(",", " ")
-           .replace("\u00A0", " ")
-           .replace("INR", "")
-           .replace("inr", "")
-           .replace("Rs.", "")
-           .replace("Rs", "")
-           .replace("rs", "")
-           .replace("रु", "")
-           .replace("₹", ""))
-    t = _amount_sanitize_re.sub("", t)
+    t = _amount_sanitize_re.sub("", str(text))
     if t.count(".") > 1:
         head, *rest = t.split(".")
         t = head + "." + "".join(rest)
     return t.strip()
 
+@lru_cache(maxsize=256)
+def _slider_decimal(val_f: float) -> Decimal:
+    """Slider floats take few distinct values (₹10,000 steps); convert each to Decimal once."""
+    return Decimal(str(val_f)).quantize(AMOUNT_QUANTUM)
+
 def _decimal_from_text(text: str) -> Decimal | None:
     norm = _normalize_amount_text(text)
     if norm == "":
@@ -75,32 +109,41 @@ def _decimal_from_text(text: str) -> Decimal | None:
     if d < 0 or d > MAX_AMOUNT_DEC:
         return None
     # cap to <= 10 decimals
-    q = Decimal("0.0000000001")
-    return d.quantize(q) if d.as_tuple().exponent < -10 else d
+    return d.quantize(AMOUNT_QUANTUM) if d.as_tuple().exponent < -10 else d
 
 # =================== DATA GUARANTEES ===================
-def _force_numeric(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    if "amount" in df.columns:
-        df["amount"] = pd.to_numeric(df["amount"], errors="coerce").fillna(0.0)
-    return df
+# Ledgers are kept with a float64 `amount` from creation on and every mutation below
+# preserves it, so renders read the stored frame directly instead of re-coercing a copy.
+def _empty_ledger() -> pd.DataFrame:
+    return pd.DataFrame({
+        "date": pd.Series(dtype="datetime64[ns]"),
+        "category": pd.Series(dtype=object),
+        "amount": pd.Series(dtype="float64"),
+        "note": pd.Series(dtype=object),
+    })
 
 def _append_transaction(df: pd.DataFrame, dt, category, amount_dec: Decimal, note: str) -> pd.DataFrame:
     row = {
-        "date": str(dt),
+        "date": pd.Timestamp(dt),
         "category": category,
         "amount": float(amount_dec),  # numeric for aggregations
         "note": (note or "").strip(),
     }
-    return _force_numeric(pd.concat([df, pd.DataFrame([row])], ignore_index=True))
+    out = pd.concat([df, pd.DataFrame([row])], ignore_index=True)
+    # only an empty ledger saved untyped by an older version needs this; coerce the fresh frame in place
+    if out["amount"].dtype != "float64":
+        out["amount"] = pd.to_numeric(out["amount"], errors="coerce").fillna(0.0)
+    return out
 
 def _update_transaction(df: pd.DataFrame, idx: int, dt, category, amount_dec: Decimal, note: str) -> pd.DataFrame:
-    df = df.copy()
-    df.loc[idx, "date"] = str(dt)
-    df.loc[idx, "category"] = category
-    df.loc[idx, "amount"] = float(amount_dec)
-    df.loc[idx, "note"] = (note or "").strip()
-    return _force_numeric(df)
+    """Edits row `idx` in place with positional scalar writes; returns the same frame."""
+    r = df.index.get_loc(idx)
+    col = df.columns.get_loc
+    df.iat[r, col("date")] = pd.Timestamp(dt)
+    df.iat[r, col("category")] = category
+    df.iat[r, col("amount")] = float(amount_dec)
+    df.iat[r, col("note")] = (note or "").strip()
+    return df
 
 def _rerun():
     try:
@@ -113,19 +156,33 @@ def _rerun():
 
 # =================== FIELD CLEAR HELPERS ===================
 def _clear_add_fields():
-    for k in ["add_date", "add_cat", "add_note", "add_amount_text", "add_amount_slider", "add_amount_mode"]:
+    for k in ["add_date", "add_cat", "add_note", "add_amount_text", "add_amount_slider", "add_amount_mode", "add_amount_value"]:
         if k in st.session_state:
             del st.session_state[k]
 
 def _clear_edit_fields():
-    for k in ["edit_date", "edit_cat", "edit_note", "edit_amount_text", "edit_amount_slider", "edit_amount_mode"]:
+    for k in ["edit_date", "edit_cat", "edit_note", "edit_amount_text", "edit_amount_slider", "edit_amount_mode", "edit_amount_value"]:
         if k in st.session_state:
             del st.session_state[k]
 
 # =================== AMOUNT UI (NO FORMS) ===================
-def amount_block(prefix: str, default_val: Decimal) -> Decimal | None:
+def _fragment(fn):
+    """st.fragment where available (Streamlit 1.37+); a plain function otherwise."""
+    frag = getattr(st, "fragment", None)
+    return frag(fn) if frag else fn
+
+@_fragment
+def amount_block(prefix: str, default_val: Decimal):
+    """
+    Render amount UI with two modes (slider/manual) as a fragment, so moving the slider or
+    typing only reruns this block. The parsed Decimal (None if invalid) is stored in
+    st.session_state[f"{prefix}_amount_value"] for the Add/Save buttons to read.
+    """
+    st.session_state[f"{prefix}_amount_value"] = _amount_input(prefix, default_val)
+
+def _amount_input(prefix: str, default_val: Decimal) -> Decimal | None:
     """
-    Render amount UI with two modes (slider/manual). Returns Decimal or None if invalid.
+    Amount widgets for amount_block. Returns Decimal or None if invalid.
     NO forms used, so values are read directly from st.session_state.
     """
     st.markdown("**Amount**")
@@ -158,7 +215,7 @@ def amount_block(prefix: str, default_val: Decimal) -> Decimal | None:
             key=slider_key,
         )
         val_f = float(st.session_state.get(slider_key, start_val))
-        return Decimal(str(val_f)).quantize(Decimal("0.0000000001"))
+        return _slider_decimal(val_f)
 
     # Manual
     st.text_input(
@@ -206,7 +263,7 @@ def render_sidebar():
             if st.button("Create", use_container_width=True):
                 name = (name or "").strip()
                 if name and name not in st.session_state.projects:
-                    st.session_state.projects[name] = pd.DataFrame(columns=["date", "category", "amount", "note"])
+                    _save_project(name, _empty_ledger())
                     st.session_state.selected_project = name
                     st.success(f"Project '{name}' created.")
                     _rerun()
@@ -221,7 +278,7 @@ def render_sidebar():
             return
 
         st.subheader("Transactions")
-        df = _force_numeric(st.session_state.projects[proj])
+        df = st.session_state.projects[proj]
 
         # ========== ADD TRANSACTION (NO FORMS) ==========
         with st.expander("➕ Add Transaction", expanded=False):
@@ -231,16 +288,17 @@ def render_sidebar():
             with c2:
                 add_cat = st.selectbox("Category", DEFAULT_CATEGORIES, index=0, key="add_cat")
 
-            add_amount = amount_block("add", default_val=Decimal("0"))
+            amount_block("add", default_val=Decimal("0"))
             add_note = st.text_input("Note (optional)", key="add_note")
 
             if st.button("Add", type="primary", use_container_width=True):
+                add_amount = st.session_state.get("add_amount_value")
                 if add_amount is None:
                     st.error("Please enter a valid amount (up to 999999999999.9999999999).")
                 else:
-                    st.session_state.projects[proj] = _append_transaction(
+                    _save_project(proj, _append_transaction(
                         df, add_date, add_cat, add_amount, add_note
-                    )
+                    ))
                     st.success(f"Added ₹{float(add_amount):,.2f}")
                     _clear_add_fields()
                     _rerun()
@@ -249,11 +307,14 @@ def render_sidebar():
         if not df.empty:
             with st.expander("✏️ Edit / Delete Transaction", expanded=False):
                 # Selection
-                choices = []
-                for idx, row in df.reset_index().iterrows():
-                    ridx = int(row["index"])
-                    label = f"{ridx}: {row['date']} • {row['category']} • ₹{row['amount']:.2f} • {(str(row.get('note',''))[:24])}"
-                    choices.append((ridx, label))
+                notes = df["note"].to_numpy() if "note" in df else [""] * len(df)
+                choices = [
+                    (int(i), f"{i}: {d} • {c} • ₹{a:.2f} • {str(n)[:24]}")
+                    for i, d, c, a, n in zip(
+                        df.index.to_numpy(), df["date"].dt.strftime("%Y-%m-%d").to_numpy(), df["category"].to_numpy(),
+                        df["amount"].to_numpy(dtype=float), notes,
+                    )
+                ]
 
                 selected_idx = st.selectbox(
                     "Pick a transaction",
@@ -274,32 +335,33 @@ def render_sidebar():
                         key="edit_cat",
                     )
 
-                edit_amount = amount_block("edit", default_val=Decimal(str(cur["amount"])))
+                amount_block("edit", default_val=Decimal(str(cur["amount"])))
                 edit_note = st.text_input("Note (optional)", value=str(cur.get("note", "")), key="edit_note")
 
                 c3, c4 = st.columns(2)
                 with c3:
                     if st.button("Save Changes", use_container_width=True):
+                        edit_amount = st.session_state.get("edit_amount_value")
                         if edit_amount is None:
                             st.error("Please enter a valid amount (up to 999999999999.9999999999).")
                         else:
                             new_df = _update_transaction(df, selected_idx, edit_date, edit_cat, edit_amount, edit_note)
-                            st.session_state.projects[proj] = new_df
+                            _save_project(proj, new_df)
                             st.success(f"Updated to ₹{float(edit_amount):,.2f}")
                             _clear_edit_fields()
                             _rerun()
                 with c4:
                     if st.button("Delete", use_container_width=True):
                         new_df = df.drop(index=selected_idx).reset_index(drop=True)
-                        st.session_state.projects[proj] = _force_numeric(new_df)
+                        _save_project(proj, new_df)
                         st.success("Transaction deleted.")
                         _clear_edit_fields()
                         _rerun()
 
         # Show data (latest first)
-        df = _force_numeric(st.session_state.projects[proj])
+        df = st.session_state.projects[proj]
         st.dataframe(
-            df.sort_values(by="date", ascending=False),
+            df.iloc[::-1],  # ledgers are kept in date order; reversed view, no sort
             hide_index=True,
             use_container_width=True,
         )